@@ -7,17 +7,17 @@ Generates Figure 4 from paper (Section 3.5, Supplementary Material C).
 
 Usage:
     python hstar_demo.py
+    python hstar_demo.py --no-plot   # numeric results only, skips matplotlib
     
 Output:
     - hstar_results.csv (skill scores by horizon and protocol)
     - figure4_hstar_comparison.png
 """
 
+import argparse
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.linear_model import Ridge
-from sklearn.preprocessing import StandardScaler
 
 
 def generate_synthetic_pm10(n_hours=17520, seed=42):
@@ -34,18 +34,19 @@ def generate_synthetic_pm10(n_hours=17520, seed=42):
     Returns:
         pd.Series with DatetimeIndex
     """
-    np.random.seed(seed)
-    t = np.arange(n_hours)
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_hours, dtype=np.float64)
+    phase = (2 * np.pi) * t                              # Shared by both cycles
     
     # Seasonal components
-    daily = 8 * np.sin(2 * np.pi * t / 24)              # Diurnal cycle
-    weekly = 4 * np.sin(2 * np.pi * t / (24*7))         # Weekly cycle
+    daily = 8 * np.sin(phase / 24)                       # Diurnal cycle
+    weekly = 4 * np.sin(phase / (24*7))                  # Weekly cycle
     trend = 0.002 * t                                    # Positive trend
-    noise = 5 * np.random.randn(n_hours)                # σ=5 µg/m³
+    noise = 5 * rng.standard_normal(n_hours)             # σ=5 µg/m³
     
     # Baseline + components
     pm10 = 25 + daily + weekly + trend + noise
-    pm10 = np.maximum(pm10, 0)  # Non-negative constraint
+    pm10 = np.maximum(pm10, 0.0)  # Non-negative constraint
     
     # Create series with hourly index
     start_date = '2020-01-01'
@@ -54,6 +55,93 @@ def generate_synthetic_pm10(n_hours=17520, seed=42):
     return pd.Series(pm10, index=index, name='PM10')
 
 
+def causal_rolling_mean(arr, w=24):
+    """
+    Trailing rolling mean via a cumulative-sum difference.
+    
+    Equivalent to pd.Series(arr).rolling(window=w, min_periods=1).mean(),
+    including gaps: NaNs are skipped, each window averages its finite
+    values (the first w windows are the available prefix, i.e. the ramp),
+    and only windows with no finite value are NaN. Single O(n) pass.
+    
+    Args:
+        arr: 1-D array of values (NaN marks missing samples)
+        w: Window length in samples (default 24 = 1 day)
+    
+    Returns:
+        np.ndarray (float64) of the same length as arr
+    
+    Example:
+        >>> x = np.array([1.0, np.nan, 3.0, np.nan, np.nan, 6.0, 7.0])
+        >>> expected = pd.Series(x).rolling(2, min_periods=1).mean()
+        >>> np.allclose(causal_rolling_mean(x, 2), expected, equal_nan=True)
+        True
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    finite = ~np.isnan(arr)
+    
+    # Windowed sums and finite-value counts from two cumulative sums
+    total = np.cumsum(np.where(finite, arr, 0.0))
+    count = np.cumsum(finite).astype(np.float64)
+    total[w:] -= total[:-w].copy()
+    count[w:] -= count[:-w].copy()
+    
+    out = np.full_like(arr, np.nan)
+    np.divide(total, count, out=out, where=count > 0)
+    
+    return out
+
+
+def _standardize(arr):
+    """
+    Z-score a 1-D array, as StandardScaler does (population std, ddof=0).
+    
+    Returns:
+        (scaled, mu, sd): scaled array plus the moments needed to transform
+        test inputs, (x - mu) / sd, and invert predictions, z * sd + mu
+    """
+    mu = arr.mean()
+    sd = arr.std()
+    sd = sd if sd > 0 else 1.0    # Constant series: leave unscaled
+    return (arr - mu) / sd, mu, sd
+
+
+def _lag_matrix(arr, p):
+    """
+    Lagged design matrix for a 1-step autoregression of order p.
+    
+    Row t holds [arr[t+p-1], ..., arr[t]] (lag 1 first) with target
+    arr[t+p]; built as a zero-copy sliding-window view over arr.
+    
+    Returns:
+        (X, target): views of shape (len(arr)-p, p) and (len(arr)-p,)
+    """
+    W = np.lib.stride_tricks.sliding_window_view(arr, p+1)
+    return W[:, -2::-1], W[:, -1]
+
+
+def fit_ridge(X, y, alpha=1.0):
+    """
+    Closed-form ridge regression, equivalent to sklearn Ridge(alpha=alpha).
+    
+    Matches Ridge's default fit_intercept=True: X and y are centred, the
+    p x p normal equations (XcᵀXc + αI) w = Xcᵀyc are solved directly and
+    the unpenalised intercept is recovered from the means.
+    
+    Returns:
+        (w, b): coefficients and intercept; predict with X @ w + b
+    """
+    x_mean = X.mean(axis=0)
+    y_mean = y.mean()
+    Xc = X - x_mean
+    
+    G = Xc.T @ Xc
+    G.flat[::G.shape[0]+1] += alpha
+    w = np.linalg.solve(G, Xc.T @ (y - y_mean))
+    
+    return w, y_mean - x_mean @ w
+
+
 def static_leaky_protocol(y, train_frac=0.75, horizons=[1,6,12,24,48,72], p=24):
     """
     Static validation with GLOBAL preprocessing (data leakage).
@@ -61,29 +149,26 @@ def static_leaky_protocol(y, train_frac=0.75, horizons=[1,6,12,24,48,72], p=24):
     Computes 24-hour rolling mean over ENTIRE series before split.
     This encodes future information into training features.
     """
-    n = len(y)
+    # Numerics run on the raw array; the index is only needed for reporting
+    y_arr = np.ascontiguousarray(y, dtype=np.float64)
+    n = len(y_arr)
     split_idx = int(n * train_frac)
     
     # LEAKAGE: compute rolling mean on full series
-    y_rolled = y.rolling(window=24, min_periods=1).mean()
+    y_rolled = causal_rolling_mean(y_arr, 24)
     
     # Split after global feature construction
-    y_train = y_rolled.iloc[:split_idx].values
-    y_test = y.iloc[split_idx:].values
+    y_train = y_rolled[:split_idx]
+    y_test = y_arr[split_idx:]
     
-    # Fit scaler on train
-    scaler = StandardScaler()
-    y_train_scaled = scaler.fit_transform(y_train.reshape(-1, 1)).flatten()
+    # Standardize on train moments
+    y_train_scaled, mu, sd = _standardize(y_train)
     
     # Create lagged features
-    X_train = np.column_stack([
-        np.roll(y_train_scaled, i) for i in range(1, p+1)
-    ])[p:]
-    y_train_target = y_train_scaled[p:]
+    X_train, y_train_target = _lag_matrix(y_train_scaled, p)
     
     # Train model
-    model = Ridge(alpha=1.0)
-    model.fit(X_train, y_train_target)
+    w, b = fit_ridge(X_train, y_train_target, alpha=1.0)
     
     # Evaluate on test
     results = {}
@@ -92,16 +177,14 @@ def static_leaky_protocol(y, train_frac=0.75, horizons=[1,6,12,24,48,72], p=24):
             continue
         
         # Forecast at horizon h
-        X_test_h = scaler.transform(
-            y_rolled.iloc[split_idx:split_idx+p].values.reshape(-1, 1)
-        ).flatten()
-        X_test_h = X_test_h[::-1].reshape(1, -1)  # Reverse for lag structure
+        X_test_h = (y_rolled[split_idx:split_idx+p] - mu) / sd
+        X_test_h = X_test_h[::-1]  # Reverse for lag structure
         
-        y_pred_scaled = model.predict(X_test_h)[0]
-        y_pred = scaler.inverse_transform([[y_pred_scaled]])[0, 0]
+        y_pred_scaled = X_test_h @ w + b
+        y_pred = y_pred_scaled * sd + mu
         
         y_true = y_test[h-1]
-        y_persist = y.iloc[split_idx-1]  # Persistence baseline
+        y_persist = y_arr[split_idx-1]  # Persistence baseline
         
         # Errors
         err_model = (y_pred - y_true)**2
@@ -126,83 +209,138 @@ def rolling_origin_causal_protocol(y, horizons=[1,6,12,24,48,72],
     Computes rolling mean using only data available up to each forecast origin.
     Simulates operational deployment.
     """
-    results = {h: {'rmse': [], 'skill': []} for h in horizons}
+    # Numerics run on the raw array; the index is only needed for reporting
+    y_arr = np.ascontiguousarray(y, dtype=np.float64)
+    n = len(y_arr)
+    origins = np.arange(W_min, n - max(horizons), step)
+    
+    # The trailing rolling mean is prefix-stable: its first k values depend
+    # only on y[:k], so one pass over the full series, sliced at each origin,
+    # is identical to recomputing it on the training data alone.
+    y_rolled_full = causal_rolling_mean(y_arr, 24)
+    
+    # Fit from lag-regression moments accumulated origin by origin (one
+    # pass over the series). Values are shifted by the mean of the first
+    # training window, which leaves centred moments unchanged but keeps
+    # the raw sums well conditioned.
+    shift = y_rolled_full[:W_min].mean()
+    u = y_rolled_full - shift
+    
+    rmse_out, skill_out, scored = _score_origins(
+        y_arr, u, shift, origins, np.asarray(horizons), p, 1.0
+    )
+    
+    # Aggregate across the scored origins of each horizon; a NaN score
+    # propagates into the mean rather than being dropped
+    summary = {
+        h: {
+            'rmse': rmse_out[scored[:, j], j].mean(),
+            'skill': skill_out[scored[:, j], j].mean()
+        }
+        for j, h in enumerate(horizons) if scored[:, j].any()
+    }
+    
+    return summary
+
+
+def _score_origins(y, u, shift, origins, horizons, p, alpha):
+    """
+    Fit and score each origin of rolling_origin_causal_protocol in turn.
+    
+    Fits the same model as standardizing the rolled series u[:origin] + shift
+    and calling fit_ridge on its lag matrix, but from running moments: each
+    (increasing) origin adds only the lag rows whose targets fall in
+    [previous origin, origin) to running Σxxᵀ, Σx, Σxy, Σy totals. Scaling
+    both sides by 1/sd is equivalent to a penalty of alpha * sd² on the
+    centred unscaled Gram matrix, and the train mean cancels in the
+    prediction.
+    
+    Horizons that run past the end of the series are not scored; the
+    returned mask marks which cells hold a score, so a NaN score (e.g. a
+    missing observation) stays distinguishable from a skipped cell.
     
+    Returns:
+        (rmse_out, skill_out, scored): arrays of shape
+        (len(origins), len(horizons)); scored is the boolean cell mask
+    """
     n = len(y)
-    origins = range(W_min, n - max(horizons), step)
+    rmse_out = np.full((len(origins), len(horizons)), np.nan)
+    skill_out = np.full((len(origins), len(horizons)), np.nan)
+    scored = np.zeros((len(origins), len(horizons)), dtype=bool)
+    
+    # Prefix moments of the (shifted) rolled series for the train variance
+    cu = np.cumsum(u)
+    cu2 = np.cumsum(u * u)
+    
+    # Running lag-regression totals over the training rows seen so far
+    X_all, y_all = _lag_matrix(u, p)    # Row k has target u[k+p]
+    Sxx = np.zeros((p, p))
+    Sx = np.zeros(p)
+    Sxy = np.zeros(p)
+    Sy = 0.0
+    start = 0
     
-    for origin in origins:
-        # Training data: strictly past
-        y_train = y.iloc[:origin]
+    for i in range(len(origins)):
+        origin = origins[i]
         
-        # CAUSAL: compute rolling mean only on training data
-        y_rolled_train = y_train.rolling(window=24, min_periods=1).mean()
+        # Add the rows whose targets fall in [previous origin, origin)
+        X_new = X_all[start:origin-p]
+        y_new = y_all[start:origin-p]
+        Sxx += X_new.T @ X_new
+        Sx += X_new.sum(axis=0)
+        Sxy += X_new.T @ y_new
+        Sy += y_new.sum()
+        start = origin - p
         
-        # Fit scaler on train
-        scaler = StandardScaler()
-        y_train_scaled = scaler.fit_transform(
-            y_rolled_train.values.reshape(-1, 1)
-        ).flatten()
+        # CAUSAL: train variance of the rolling mean over [:origin] only
+        u_mean = cu[origin-1] / origin
+        var = cu2[origin-1] / origin - u_mean**2
+        sd2 = var if var > 0 else 1.0    # Constant series: leave unscaled
         
-        # Lagged features
-        X_train = np.column_stack([
-            np.roll(y_train_scaled, i) for i in range(1, p+1)
-        ])[p:]
-        y_train_target = y_train_scaled[p:]
+        # Centred normal equations from the running moments
+        m = origin - p
+        x_mean = Sx / m
+        y_mean = Sy / m
+        G = Sxx - m * np.outer(x_mean, x_mean)
+        G.flat[::p+1] += alpha * sd2
+        w = np.linalg.solve(G, Sxy - m * y_mean * x_mean)
         
-        # Train model
-        model = Ridge(alpha=1.0)
-        model.fit(X_train, y_train_target)
+        # Forecast once: the test features (causal rolling mean up to
+        # origin, lag 1 first) are the same for every horizon
+        X_test_h = u[origin-p:origin][::-1]
+        y_pred = (X_test_h - x_mean) @ w + y_mean + shift
         
-        # Forecast at each horizon
-        for h in horizons:
-            if origin + h >= n:
-                continue
-            
-            # Use causal rolling mean up to origin
-            X_test_h = scaler.transform(
-                y_rolled_train.iloc[-p:].values.reshape(-1, 1)
-            ).flatten()
-            X_test_h = X_test_h[::-1].reshape(1, -1)
-            
-            y_pred_scaled = model.predict(X_test_h)[0]
-            y_pred = scaler.inverse_transform([[y_pred_scaled]])[0, 0]
-            
-            y_true = y.iloc[origin + h - 1]
-            y_persist = y.iloc[origin - 1]
-            
-            # Errors
-            err_model = (y_pred - y_true)**2
-            err_persist = (y_persist - y_true)**2
-            
-            # Skill score
-            skill = 1 - (err_model / err_persist) if err_persist > 0 else 0
-            
-            results[h]['rmse'].append(np.sqrt(err_model))
-            results[h]['skill'].append(skill)
-    
-    # Aggregate across origins
-    summary = {}
-    for h in horizons:
-        if len(results[h]['rmse']) > 0:
-            summary[h] = {
-                'rmse': np.mean(results[h]['rmse']),
-                'skill': np.mean(results[h]['skill'])
-            }
+        # Score all horizons at once; clip lookups past the series end
+        valid = origin + horizons < n
+        y_true = y[np.minimum(origin + horizons - 1, n - 1)]
+        y_persist = y[origin - 1]
+        
+        # Errors
+        err_model = (y_pred - y_true)**2
+        err_persist = (y_persist - y_true)**2
+        
+        # Skill score
+        nonzero = err_persist > 0
+        skill = np.where(
+            nonzero, 1 - err_model / np.where(nonzero, err_persist, 1.0), 0.0
+        )
+        
+        rmse_out[i, valid] = np.sqrt(err_model[valid])
+        skill_out[i, valid] = skill[valid]
+        scored[i] = valid
     
-    return summary
+    return rmse_out, skill_out, scored
 
 
 def compute_hstar(results, threshold=0.0):
     """Compute H* = max horizon with skill > threshold."""
-    horizons = sorted(results.keys())
-    for h in reversed(horizons):
-        if results[h]['skill'] > threshold:
-            return h
-    return 0
+    hs = np.fromiter(sorted(results), dtype=int)
+    sk = np.array([results[h]['skill'] for h in hs], dtype=np.float64)
+    mask = sk > threshold
+    return int(hs[mask].max()) if mask.any() else 0
 
 
-def main():
+def main(plot=True):
     print("Generating synthetic PM10 data (n=17,520 hours)...")
     y = generate_synthetic_pm10()
     
@@ -226,20 +364,33 @@ def main():
     print(f"{'='*60}\n")
     
     # Tabulate results
+    hs = np.array(horizons)
+    static_skill = np.array([static_results.get(h, {}).get('skill', np.nan) for h in hs])
+    rolling_skill = np.array([rolling_results.get(h, {}).get('skill', np.nan) for h in hs])
+    static_rmse = np.array([static_results.get(h, {}).get('rmse', np.nan) for h in hs])
+    rolling_rmse = np.array([rolling_results.get(h, {}).get('rmse', np.nan) for h in hs])
+    
     df_results = pd.DataFrame({
-        'horizon_h': horizons,
-        'static_skill': [static_results.get(h, {}).get('skill', np.nan) for h in horizons],
-        'rolling_skill': [rolling_results.get(h, {}).get('skill', np.nan) for h in horizons],
-        'static_rmse': [static_results.get(h, {}).get('rmse', np.nan) for h in horizons],
-        'rolling_rmse': [rolling_results.get(h, {}).get('rmse', np.nan) for h in horizons],
+        'horizon_h': hs,
+        'static_skill': static_skill,
+        'rolling_skill': rolling_skill,
+        'static_rmse': static_rmse,
+        'rolling_rmse': rolling_rmse,
+        'inflation': (static_skill / rolling_skill - 1) * 100,
     })
-    df_results['inflation'] = (df_results['static_skill'] / df_results['rolling_skill'] - 1) * 100
     
     print(df_results.to_string(index=False))
     df_results.to_csv('hstar_results.csv', index=False)
     print("\n✓ Saved results to hstar_results.csv")
     
-    # Generate Figure 4
+    if not plot:
+        return
+    
+    # Generate Figure 4 (headless Agg backend, selected before pyplot loads)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
     
     # Panel (a): RMSE
@@ -263,8 +414,13 @@ def main():
     
     plt.tight_layout()
     plt.savefig('figure4_hstar_comparison.png', dpi=300, bbox_inches='tight')
+    plt.close(fig)
     print("✓ Saved figure to figure4_hstar_comparison.png\n")
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--no-plot', action='store_true',
+                        help='skip Figure 4 (and the matplotlib import)')
+    args = parser.parse_args()
+    main(plot=not args.no_plot)
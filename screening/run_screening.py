@@ -15,12 +15,12 @@ Output:
 import re
 import pandas as pd
 import numpy as np
-from scipy import stats
+from scipy.special import ndtri
 
 # Regex patterns from Section 2.2 and Supplementary Material A
 TASK_PATTERNS = [
     r'multi[-\s]?step',
-    r'[\d]+[-\s]?(hour|day|step)[-\s]?ahead',
+    r'[\d]+[-\s]?(?:hour|day|step)[-\s]?ahead',
     r'extended[-\s]?horizon',
     r'[\d]+h\s+forecasting'
 ]
@@ -33,6 +33,19 @@ VALIDATION_PATTERNS = [
     r'sequential[-\s]?retraining'
 ]
 
+# Python-backed strings keep str.contains on the re engine: Arrow-backed
+# columns use RE2, whose \s and \d are ASCII-only and would miss e.g.
+# non-breaking spaces that are common in Scopus exports
+_STRING_DTYPE = 'string[python]'
+
+# One alternation per category, so each abstract is scanned once per
+# category; compiled at import, abstracts are lower-cased before matching
+_TASK_UNION_SRC = "|".join(f"(?:{pattern})" for pattern in TASK_PATTERNS)
+_VALIDATION_UNION_SRC = "|".join(f"(?:{pattern})" for pattern in VALIDATION_PATTERNS)
+
+_TASK_UNION = re.compile(_TASK_UNION_SRC)
+_VALIDATION_UNION = re.compile(_VALIDATION_UNION_SRC)
+
 
 def load_corpus():
     """
@@ -55,7 +68,7 @@ def load_corpus():
     corpus = pd.DataFrame({
         'eid': [f'2-s2.0-{85000000000 + i}' for i in range(n)],
         'title': [f'Study {i}' for i in range(n)],
-        'abstract': [''] * n,
+        'abstract': pd.array([''] * n, dtype=_STRING_DTYPE),
         'year': np.random.randint(2000, 2027, n)
     })
     
@@ -75,6 +88,9 @@ def classify_abstract(text):
     """
     Binary classification: task declaration (yes/no), validation mention (yes/no).
     
+    Single-abstract convenience; main() classifies the whole corpus at once
+    with the same union patterns via pd.Series.str.contains.
+    
     Args:
         text: Abstract text (title + abstract + keywords concatenated)
     
@@ -84,12 +100,10 @@ def classify_abstract(text):
     text_lower = text.lower()
     
     # Task indicators
-    has_task = any(re.search(pattern, text_lower, re.IGNORECASE) 
-                   for pattern in TASK_PATTERNS)
+    has_task = bool(_TASK_UNION.search(text_lower))
     
     # Validation indicators
-    has_validation = any(re.search(pattern, text_lower, re.IGNORECASE) 
-                         for pattern in VALIDATION_PATTERNS)
+    has_validation = bool(_VALIDATION_UNION.search(text_lower))
     
     return has_task, has_validation
 
@@ -99,12 +113,25 @@ def wilson_ci(p, n, alpha=0.05):
     Wilson score confidence interval for binomial proportion.
     
     Recommended for small proportions (Brown et al. 2001).
+    
+    Args:
+        p: Observed proportion(s), scalar or array-like
+        n: Sample size(s), broadcastable against p
+        alpha: Significance level (default 0.05 = 95% CI)
+    
+    Returns:
+        (lower, upper): scalars for scalar input, otherwise arrays
     """
-    z = stats.norm.ppf(1 - alpha/2)
+    p = np.asarray(p, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+    
+    z = ndtri(1 - alpha/2)    # Standard normal quantile
     denominator = 1 + z**2/n
     centre = (p + z**2/(2*n)) / denominator
     spread = z * np.sqrt(p*(1-p)/n + z**2/(4*n**2)) / denominator
-    return centre - spread, centre + spread
+    
+    # [()] unwraps 0-d results to scalars and leaves arrays unchanged
+    return (centre - spread)[()], (centre + spread)[()]
 
 
 def main():
@@ -113,14 +140,19 @@ def main():
     
     # Run classification
     print("\nRunning lexical screening...")
-    results = corpus['abstract'].apply(classify_abstract)
-    corpus['task_declared'] = results.apply(lambda x: x[0])
-    corpus['validation_mentioned'] = results.apply(lambda x: x[1])
+    # Lower-case once; the union patterns are all lower-case literals
+    lowered = corpus['abstract'].str.lower()
+    corpus['task_declared'] = lowered.str.contains(
+        _TASK_UNION_SRC, regex=True, na=False
+    )
+    corpus['validation_mentioned'] = lowered.str.contains(
+        _VALIDATION_UNION_SRC, regex=True, na=False
+    )
     
     # Compute prevalences
     n_total = len(corpus)
-    n_task = corpus['task_declared'].sum()
-    n_validation = corpus['validation_mentioned'].sum()
+    n_task = int(np.count_nonzero(corpus['task_declared'].to_numpy(dtype=bool)))
+    n_validation = int(np.count_nonzero(corpus['validation_mentioned'].to_numpy(dtype=bool)))
     
     p_task = n_task / n_total
     p_validation = n_validation / n_total